@@ -3,10 +3,12 @@ from fastapi.responses import JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 import logging
+import os
 
 from Backend.logging_config import setup_logging
-from Backend.database.init import init_database
+from Backend.database.init import close_database, init_database
 from Backend.classes.LLM import OpenAILLM
+from Backend.classes.LLM_Cache import ExtractionCache
 from Backend.classes.Skill_Database_Handler import ESCODatabase
 from Backend.routers import users, sessions, chat, skills, utils
 
@@ -26,7 +28,13 @@ async def lifespan(app: FastAPI):
         logger.info("Database initialized successfully")
 
         # Initialize LLM and store in app state
-        app.state.llm = OpenAILLM(model_name="gpt-4o-mini")
+        llm_cache_dir = os.getenv("LLM_CACHE_DIR", "Database/llm_cache")
+        app.state.llm = OpenAILLM(
+            model_name="gpt-4o-mini",
+            max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", "16")),
+            max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "5")),
+            cache=ExtractionCache(llm_cache_dir) if llm_cache_dir else None
+        )
         logger.info("LLM initialized successfully")
 
         # Initialize available skills-Database Manager
@@ -37,37 +45,52 @@ async def lifespan(app: FastAPI):
         from Backend.routers.chat import set_dependencies
         set_dependencies(app.state.llm, app.state.esco_database_handler)
 
+        # Build the OpenAPI schema now instead of on the first docs request
+        if app.openapi_url:
+            app.openapi()
+            logger.info("OpenAPI schema generated successfully")
+
     except Exception as e:
-        logger.exception(f"Failed to initialize application: {e}")
+        logger.exception("Failed to initialize application: %s", e)
         raise
     
     yield
     
     # Shutdown
     logger.info("Shutting down application...")
+    await app.state.esco_database_handler.aclose()
+    close_database()
+
 
+# API docs can be turned off, e.g. in production
+docs_enabled = os.getenv("API_DOCS", "true").lower() not in ("false", "0", "no", "off")
 
 app = FastAPI(
     title="Bachelor Thesis Chatbot API",
     description="API for skill-extraction chatbot with database integration",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    docs_url="/docs" if docs_enabled else None,
+    redoc_url="/redoc" if docs_enabled else None,
+    openapi_url="/openapi.json" if docs_enabled else None
 )
 
 # Add CORS middleware
+# Auth uses the Authorization header, not cookies, so credentials are not needed
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify your frontend URL
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_origins=os.getenv("CORS_ORIGINS", "*").split(","),  # In production, specify your frontend URL
+    allow_credentials=False,
+    allow_methods=["GET", "POST", "PUT"],
+    allow_headers=["Authorization", "Content-Type"],
+    expose_headers=["X-Session-Id"],  # Lets the cross-origin frontend read the session ID of a streamed chat
 )
 
 # Global exception handler to catch all unhandled exceptions
 @app.exception_handler(Exception)
 async def global_exception_handler(request: Request, exc: Exception):
     """Global exception handler that logs full stack traces."""
-    logger.exception(f"Unhandled exception occurred: {exc}")
+    logger.exception("Unhandled exception occurred: %s", exc)
     
     # In production, you might want to hide the stack trace from the response
     # and just return a generic error message
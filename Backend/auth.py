@@ -2,17 +2,18 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlmodel import Session
 from typing import Optional
-from datetime import datetime, timedelta
+from datetime import timedelta
+from threading import Lock
+from cachetools import TTLCache
+import hashlib
+import time
 import jwt
 from passlib.context import CryptContext
 
 from Backend.database.init import get_db_session_dependency
 from Backend.database.models.users import User
-
-# JWT Configuration
-SECRET_KEY = "your-secret-key-here"  # In production, use environment variable
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
+from Backend.schemas import UserResponse
+from Backend.auth_config import auth_config
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -20,43 +21,76 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # Security
 security = HTTPBearer()
 
+# Users rarely change, so keep recently seen ones for a short time
+USER_CACHE_TTL_SECONDS = 30
+_user_cache: TTLCache = TTLCache(maxsize=10_000, ttl=USER_CACHE_TTL_SECONDS)
+_user_cache_lock = Lock()
+
+# Bearer tokens are reused for many requests, so remember verified ones for a few seconds
+TOKEN_CACHE_TTL_SECONDS = 10
+_token_cache: TTLCache = TTLCache(maxsize=10_000, ttl=TOKEN_CACHE_TTL_SECONDS)
+_token_cache_lock = Lock()
+
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a new JWT access token."""
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now() + expires_delta
-    else:
-        expire = datetime.now() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    # exp is a UTC epoch timestamp, a naive local datetime would be off by the server's UTC offset
+    expires_in = expires_delta.total_seconds() if expires_delta else auth_config.access_token_expire_minutes * 60
+    to_encode = {**data, "exp": int(time.time() + expires_in)}
+    encoded_jwt = jwt.encode(to_encode, auth_config.signing_key.key, algorithm=auth_config.algorithm)
     return encoded_jwt
 
 
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """Verify JWT token and return user ID."""
+    token_key = hashlib.blake2b(credentials.credentials.encode(), digest_size=16).digest()
+    with _token_cache_lock:
+        cached = _token_cache.get(token_key)
+    if cached is not None:
+        user_id, expires_at = cached
+        if expires_at > time.time():
+            return user_id
+
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(credentials.credentials, auth_config.signing_key.key, algorithms=[auth_config.algorithm])
         user_id: int = payload.get("sub")
         if user_id is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Could not validate credentials"
             )
-        return user_id
     except jwt.PyJWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
 
+    # Only successful verifications are cached and never beyond the token's own expiry
+    with _token_cache_lock:
+        _token_cache[token_key] = (user_id, payload.get("exp", float("inf")))
+    return user_id
 
-def get_current_user(user_id: int = Depends(verify_token), db: Session = Depends(get_db_session_dependency)):
+
+def get_current_user_id(user_id: str = Depends(verify_token)) -> int:
+    """Get current user ID from JWT token without a database lookup."""
+    return int(user_id)
+
+
+def get_current_user(user_id: int = Depends(get_current_user_id), db: Session = Depends(get_db_session_dependency)) -> UserResponse:
     """Get current user from JWT token."""
-    user = db.get(User, user_id)
-    if user is None:
+    with _user_cache_lock:
+        user = _user_cache.get(user_id)
+    if user is not None:
+        return user
+
+    db_user = db.get(User, user_id)
+    if db_user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="User not found"
         )
+    # Cache a plain snapshot instead of the ORM object so it is never tied to a session
+    user = UserResponse.model_validate(db_user)
+    with _user_cache_lock:
+        _user_cache[user_id] = user
     return user
@@ -0,0 +1,45 @@
+"""Authentication configuration management."""
+
+import base64
+import logging
+import os
+import secrets
+import jwt
+from dotenv import load_dotenv
+
+load_dotenv()
+logger = logging.getLogger(__name__)
+
+
+class AuthConfig:
+    """JWT configuration class with environment variable support."""
+
+    def __init__(self):
+        self.secret_key = self._get_secret_key()
+        self.algorithm = "HS256"
+        self.access_token_expire_minutes = self._get_int_env("ACCESS_TOKEN_EXPIRE_MINUTES", 30)
+        # Prepare the signing key once instead of on every encode/decode
+        self.signing_key = jwt.PyJWK({
+            "kty": "oct",
+            "k": base64.urlsafe_b64encode(self.secret_key).rstrip(b"=").decode(),
+            "alg": self.algorithm,
+        })
+
+    def _get_secret_key(self) -> bytes:
+        """Get the JWT secret from the environment or generate a random one."""
+        secret_key = os.getenv("SECRET_KEY")
+        if secret_key:
+            return secret_key.encode()
+        logger.warning("SECRET_KEY is not set, using a random key. Issued tokens become invalid on restart")
+        return secrets.token_bytes(32)
+
+    def _get_int_env(self, key: str, default: int) -> int:
+        """Get integer value from environment variable."""
+        try:
+            return int(os.getenv(key, str(default)))
+        except ValueError:
+            return default
+
+
+# Global config instance
+auth_config = AuthConfig()
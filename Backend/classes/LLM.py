@@ -1,16 +1,41 @@
-from openai import OpenAI
-from openai.types.responses.response import Response as OpenAIResponse
 import os
 from abc import ABC, abstractmethod
-from typing import Dict, Optional, Any, List
+from typing import AsyncIterator, Dict, Optional, Any, List, Union, TYPE_CHECKING
 from sqlmodel import Session
 from Backend.database.models.messages import ChatSession, ChatMessage, MessageType
 from Backend.database.models.skills import ChatSkillBase, ESCOSkillModel
 from Backend.classes.Model_Config import ModelConfigOpenAI, ModelConfig
-from Backend.classes.Skill_Classes import BaseSkill, CustomSkill, ESCOSkill, CustomSkillList
-from Backend.utils import get_prompt
+from Backend.classes.Skill_Classes import BaseSkill, CustomSkill, ESCOSkill, CustomSkillList, SkillMappingList
+from Backend.classes.LLM_Cache import ExtractionCache
+import asyncio
 import logging
-import json
+import orjson
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from openai.types.responses.response import Response as OpenAIResponse
+
+logger = logging.getLogger(__name__)
+
+# Structured output format of map_skill, constant so it is not rebuilt on every call
+_MAP_SKILL_TEXT_FORMAT = {
+    "format": {
+        "type": "json_schema",
+        "name": "skill_id",
+        "schema": {
+            "type": "object",
+            "properties": {
+                "id": {
+                    "type": "integer",
+                    "description": "The ID of the best matching skill from the available skills list."
+                }
+            },
+            "required": ["id"],
+            "additionalProperties": False
+        },
+        "strict": True
+    }
+}
 
 class BaseLLM(ABC):
     def __init__(self, model_name: str, config: Optional[ModelConfig] = None):
@@ -18,15 +43,23 @@ class BaseLLM(ABC):
         self.config: Optional[ModelConfig] = config
     
     @abstractmethod
-    def chat(
+    async def chat(
         self, 
         chat_session: ChatSession,
         db_session: Session
     ) -> ChatMessage:
         pass
-    
+
+    @abstractmethod
+    def chat_stream(
+        self,
+        chat_session: ChatSession,
+        db_session: Session
+    ) -> AsyncIterator[Union[str, ChatMessage]]:
+        pass
+
     @abstractmethod
-    def extract_skills(
+    async def extract_skills(
         self,
         instruction: str,
         message: ChatMessage
@@ -34,7 +67,7 @@ class BaseLLM(ABC):
         pass
 
     @abstractmethod
-    def map_skill(
+    async def map_skill(
         self,
         instruction: str,
         skill: CustomSkill,
@@ -42,100 +75,327 @@ class BaseLLM(ABC):
     ) -> BaseSkill:
         pass
 
+    @abstractmethod
+    async def map_skills(
+        self,
+        instruction: str,
+        skills: List[CustomSkill],
+        available_skills: List[List[BaseSkill]]
+    ) -> List[Optional[ChatSkillBase]]:
+        pass
+
 
 class OpenAILLM(BaseLLM):
-    def __init__(self, model_name: str, config: Optional[ModelConfigOpenAI] = None):
+    def __init__(
+        self,
+        model_name: str,
+        config: Optional[ModelConfigOpenAI] = None,
+        max_concurrency: int = 16,
+        max_retries: int = 5,
+        cache: Optional[ExtractionCache] = None
+    ):
         super().__init__(model_name, config)
+        # Extraction and mapping results are cached by their exact inputs, chat replies are not
+        self.cache = cache
 
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY is not set")
-        self.client = OpenAI(api_key=api_key)
-
-    def chat(
-        self, 
-        chat_session: ChatSession,
-        db_session: Session
-    ) -> ChatMessage: 
+        # The client retries rate limits, connection errors and 5xx responses with exponential backoff
+        # and honours the Retry-After header, so no extra retry wrapper is needed
+        # Imported here so importing BaseLLM does not load the whole OpenAI SDK
+        from openai import AsyncOpenAI
+        self.client: "AsyncOpenAI" = AsyncOpenAI(api_key=api_key, max_retries=max_retries)
+        # Bound the number of in-flight OpenAI requests across all concurrent chats
+        self._semaphore = asyncio.Semaphore(max_concurrency)
 
+    async def _generate_reply(self, chat_session: ChatSession) -> ChatMessage:
         config = self.config.to_dict() if self.config else {}
-        response = self.client.responses.create(
-            model=self.model_name,
-            input=chat_session.to_openai_input(),
-            **config
-        )
-        
+        async with self._semaphore:
+            response = await self.client.responses.create(
+                model=self.model_name,
+                input=chat_session.to_openai_input(),
+                **config
+            )
+        return self._to_assistant_message(chat_session, response)
+
+    def _to_assistant_message(self, chat_session: ChatSession, response: "OpenAIResponse") -> ChatMessage:
         # Create ChatMessage from OpenAI response
         assistant_message = ChatMessage.from_openai_message(chat_session, response)
         assistant_message.session_id = chat_session.session_id
         assistant_message.role = MessageType.ASSISTANT
+        # Keeps the loaded history of the session current for the next turn, objects are not expired on commit
+        assistant_message.chat_session = chat_session
+        return assistant_message
+
+    async def chat(
+        self, 
+        chat_session: ChatSession,
+        db_session: Session
+    ) -> ChatMessage: 
+        assistant_message = await self._generate_reply(chat_session)
         
-        # Save to database
-        db_session.add(assistant_message)
-        db_session.commit()
-        db_session.refresh(assistant_message)
-        db_session.refresh(chat_session)  # Refresh to update chat_messages relationship
+        # Save to database, this also commits messages still pending on the chat session
+        await self._save_messages([assistant_message], db_session)
         
         return assistant_message
 
-    def extract_skills(
+    async def chat_stream(
+        self,
+        chat_session: ChatSession,
+        db_session: Session
+    ) -> AsyncIterator[Union[str, ChatMessage]]:
+        """Yield the text of the reply while it is generated, then the saved assistant message."""
+        config = self.config.to_dict() if self.config else {}
+        openai_input = chat_session.to_openai_input()
+        events: asyncio.Queue = asyncio.Queue()
+
+        async def read_stream() -> None:
+            # The semaphore is only held while OpenAI sends the reply, a slow client reading from the queue does not keep it
+            try:
+                async with self._semaphore:
+                    stream = await self.client.responses.create(
+                        model=self.model_name,
+                        input=openai_input,
+                        stream=True,
+                        **config
+                    )
+                    async for event in stream:
+                        events.put_nowait(event)
+            except Exception as e:
+                events.put_nowait(e)
+            finally:
+                events.put_nowait(None)
+
+        reader = asyncio.create_task(read_stream())
+        response = None
+        try:
+            while (event := await events.get()) is not None:
+                if isinstance(event, Exception):
+                    raise event
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+                elif event.type == "response.completed":
+                    response = event.response
+        finally:
+            reader.cancel()
+        if response is None:
+            raise RuntimeError("OpenAI stream ended without a completed response")
+
+        assistant_message = self._to_assistant_message(chat_session, response)
+        # Save to database, this also commits messages still pending on the chat session
+        await self._save_messages([assistant_message], db_session)
+        yield assistant_message
+
+    async def chat_batch(
+        self,
+        chat_sessions: List[ChatSession],
+        db_session: Session
+    ) -> List[ChatMessage]:
+        """Reply to several chat sessions concurrently and save all replies in a single commit."""
+        assistant_messages = await asyncio.gather(*(
+            self._generate_reply(chat_session) for chat_session in chat_sessions
+        ))
+        await self._save_messages(assistant_messages, db_session)
+        return list(assistant_messages)
+
+    async def _save_messages(self, messages: List[ChatMessage], db_session: Session) -> None:
+        db_session.add_all(messages)
+        # Commit in a worker thread, waiting on a database lock must not block the event loop
+        await asyncio.to_thread(db_session.commit)
+
+    async def extract_skills(
         self,
         instruction: str,
         message: ChatMessage
     ) -> List[CustomSkill]:
-        response = self.client.responses.parse(
-            model=self.model_name,
-            input=[
-                {"role": "system", "content": instruction},
-                {
-                    "role": "user",
-                    "content": message.message_content,
+        cache_key = ExtractionCache.make_key(["extract_skills", self.model_name, instruction, message.message_content])
+        cached = self.cache.get(cache_key) if self.cache else None
+        if cached is not None:
+            return CustomSkillList.model_validate_json(cached).skills
+
+        async with self._semaphore:
+            response = await self.client.responses.parse(
+                model=self.model_name,
+                input=self._extract_skills_input(instruction, message),
+                text_format=CustomSkillList,
+            )
+        if self.cache:
+            self.cache.put(cache_key, response.output_parsed.model_dump_json())
+        return response.output_parsed.skills
+
+    def _extract_skills_input(self, instruction: str, message: ChatMessage) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": instruction},
+            {
+                "role": "user",
+                "content": message.message_content,
+            },
+        ]
+
+    async def submit_extract_batch(
+        self,
+        instruction: str,
+        messages: List[ChatMessage]
+    ) -> str:
+        """Submit skill extraction for many messages as one OpenAI batch job and return the batch ID.
+
+        Batch jobs finish within 24 hours at half the cost, which suits offline reprocessing of stored chats.
+        """
+        text_format = {
+            "format": {
+                "type": "json_schema",
+                "name": "custom_skill_list",
+                "schema": CustomSkillList.model_json_schema(),
+                "strict": False
+            }
+        }
+        lines = [
+            orjson.dumps({
+                "custom_id": str(message.message_id),
+                "method": "POST",
+                "url": "/v1/responses",
+                "body": {
+                    "model": self.model_name,
+                    "input": self._extract_skills_input(instruction, message),
+                    "text": text_format,
                 },
-            ],
-            text_format=CustomSkillList,
+            })
+            for message in messages
+        ]
+        batch_file = await self.client.files.create(
+            file=("extract_skills.jsonl", b"\n".join(lines)),
+            purpose="batch"
         )
-        return response.output_parsed.skills
+        batch = await self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint="/v1/responses",
+            completion_window="24h"
+        )
+        logger.info("Submitted skill extraction batch %s for %s messages", batch.id, len(messages))
+        return batch.id
+
+    async def poll_batch(
+        self,
+        batch_id: str,
+        max_interval: float = 60.0
+    ) -> Dict[str, List[CustomSkill]]:
+        """Wait for a skill extraction batch and return the extracted skills by message ID.
+
+        Messages whose request failed are logged and left out of the result.
+        """
+        interval = 1.0
+        batch = await self.client.batches.retrieve(batch_id)
+        while batch.status not in ("completed", "failed", "expired", "cancelled"):
+            await asyncio.sleep(interval)
+            interval = min(interval * 2, max_interval)
+            batch = await self.client.batches.retrieve(batch_id)
+        if batch.status != "completed":
+            raise RuntimeError(f"Batch {batch_id} ended with status {batch.status}")
+
+        failed: Dict[str, Any] = {}
+        results: Dict[str, List[CustomSkill]] = {}
+        # Requests that failed are only written to the error file, it is missing if none failed
+        for result in await self._read_batch_file(batch.error_file_id):
+            failed[result["custom_id"]] = result.get("error") or result.get("response")
+        # The output file is missing if every request failed
+        for result in await self._read_batch_file(batch.output_file_id):
+            response = result.get("response")
+            if result.get("error") or response is None or response["status_code"] != 200:
+                failed[result["custom_id"]] = result.get("error") or response
+                continue
+            output_text = "".join(
+                content["text"]
+                for item in response["body"]["output"] if item["type"] == "message"
+                for content in item["content"] if content["type"] == "output_text"
+            )
+            results[result["custom_id"]] = CustomSkillList.model_validate_json(output_text).skills
+        if failed:
+            logger.warning(
+                "Skill extraction failed for %s of %s messages in batch %s: %s",
+                len(failed), len(failed) + len(results), batch_id, failed
+            )
+        return results
+
+    async def _read_batch_file(self, file_id: Optional[str]) -> List[Dict[str, Any]]:
+        """Read the JSONL lines of a batch output or error file."""
+        if file_id is None:
+            return []
+        content = await self.client.files.content(file_id)
+        return [orjson.loads(line) for line in content.content.splitlines() if line]
     
-    def map_skill(
+    async def map_skill(
         self,
         instruction: str,
         skill: CustomSkill,
         available_skills: List[BaseSkill]
     ) -> ChatSkillBase:
-        available_skills_str = "\n".join([f"id: {i} - title: {skill.title} - description: {skill.get_description()}" for i, skill in enumerate(available_skills)])
-        mapping_prompt = get_prompt("information_mapper").format(skill=skill, available_skills=available_skills_str)
-        logging.debug(f"mapping_prompt: {mapping_prompt}")
-        response = self.client.responses.create(
-            model=self.model_name,
-            input=mapping_prompt,
-            text={
-                "format": {
-                    "type": "json_schema",
-                    "name": "skill_id",
-                    "schema": {
-                        "type": "object",
-                        "properties": {
-                            "id": {
-                                "type": "integer",
-                                "description": "The ID of the best matching skill from the available skills list."
-                            }
-                        },
-                        "required": ["id"],
-                        "additionalProperties": False
-                    },
-                    "strict": True
-                }
-            }
-        )
-        response_dict = json.loads(response.output_text)
-        
-        logging.info(f"response_type: {type(response_dict)}")
-        logging.info(f"response.output_text: {response_dict}")
+        available_skills_str = "\n".join([f"id: {i} - {skill.prompt_text}" for i, skill in enumerate(available_skills)])
+        mapping_prompt = instruction.format(skill=skill, available_skills=available_skills_str)
+        logger.debug("mapping_prompt: %s", mapping_prompt)
+        cache_key = ExtractionCache.make_key(["map_skill", self.model_name, mapping_prompt])
+        output_text = self.cache.get(cache_key) if self.cache else None
+        if output_text is None:
+            async with self._semaphore:
+                response = await self.client.responses.create(
+                    model=self.model_name,
+                    input=mapping_prompt,
+                    text=_MAP_SKILL_TEXT_FORMAT
+                )
+            output_text = response.output_text
+            if self.cache:
+                self.cache.put(cache_key, output_text)
+        response_dict = orjson.loads(output_text)
+        logger.debug("map_skill output: %s", response_dict)
         id = int(response_dict["id"])
-        logging.info(f"id: {id} id_type: {type(id)}")
         skill = available_skills[id]
 
         if isinstance(skill, ESCOSkill):
             return ESCOSkillModel.from_pydantic(skill)
         else:
-            raise NotImplementedError(f"Mapping for skill type {type(skill)} is not implemented")
\ No newline at end of file
+            raise NotImplementedError(f"Mapping for skill type {type(skill)} is not implemented")
+
+    async def map_skills(
+        self,
+        instruction: str,
+        skills: List[CustomSkill],
+        available_skills: List[List[BaseSkill]]
+    ) -> List[Optional[ChatSkillBase]]:
+        """Map several skills in one request, available_skills[i] holds the candidates for skills[i]."""
+        skills_str = "\n\n".join(
+            f"Skill id: {skill_id} - {skill.prompt_text}\n"
+            + "\n".join(f"  candidate id: {i} - {candidate.prompt_text}" for i, candidate in enumerate(candidates))
+            for skill_id, (skill, candidates) in enumerate(zip(skills, available_skills))
+        )
+        mapping_prompt = instruction.format(skills=skills_str)
+        logger.debug("mapping_prompt: %s", mapping_prompt)
+        cache_key = ExtractionCache.make_key(["map_skills", self.model_name, mapping_prompt])
+        cached = self.cache.get(cache_key) if self.cache else None
+        if cached is not None:
+            mapping_list = SkillMappingList.model_validate_json(cached)
+        else:
+            async with self._semaphore:
+                response = await self.client.responses.parse(
+                    model=self.model_name,
+                    input=mapping_prompt,
+                    text_format=SkillMappingList,
+                )
+            mapping_list = response.output_parsed
+            if self.cache:
+                self.cache.put(cache_key, mapping_list.model_dump_json())
+
+        mapped_skills: List[Optional[ChatSkillBase]] = [None] * len(skills)
+        for mapping in mapping_list.mappings:
+            if not 0 <= mapping.skill_id < len(skills) or mapped_skills[mapping.skill_id] is not None:
+                logger.warning("Ignoring invalid or duplicate mapping: %s", mapping)
+                continue
+            candidates = available_skills[mapping.skill_id]
+            if not 0 <= mapping.candidate_id < len(candidates):
+                logger.warning("Ignoring mapping to unknown candidate: %s", mapping)
+                continue
+            skill = candidates[mapping.candidate_id]
+            if isinstance(skill, ESCOSkill):
+                mapped_skills[mapping.skill_id] = ESCOSkillModel.from_pydantic(skill)
+            else:
+                raise NotImplementedError(f"Mapping for skill type {type(skill)} is not implemented")
+        return mapped_skills
@@ -0,0 +1,38 @@
+from pathlib import Path
+from typing import Iterable, Optional, Union
+import hashlib
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class ExtractionCache:
+    """Content-addressable disk cache for structured LLM results, stored as one JSON file per key."""
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def make_key(parts: Iterable[str]) -> str:
+        return hashlib.sha256(b"\x00".join(part.encode() for part in parts)).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        try:
+            return self._path(key).read_text()
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, value: str) -> None:
+        path = self._path(key)
+        # Write to a temporary file first so concurrent readers never see a partial entry
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            tmp_path.write_text(value)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning("Failed to write LLM cache entry %s: %s", key, e)
@@ -1,9 +1,11 @@
-from pydantic import BaseModel, Field
-from typing import Literal, Dict, List, Optional
+from functools import cached_property
+from pydantic import BaseModel, ConfigDict, Field
+from typing import ClassVar, Literal, Dict, List, Optional
 
 
 class BaseSkill(BaseModel):
-    pass
+    # Skills are shared between requests (e.g. the ESCO search cache), so they must not change after creation
+    model_config = ConfigDict(frozen=True)
 
 class CustomSkill(BaseSkill):
     name: str
@@ -11,7 +13,13 @@ class CustomSkill(BaseSkill):
     confidence: float = Field(ge=0, le=1)
     evidence: str = Field(description="Direct quote or paraphrased section of the interview that supports the inference.")
 
+    @cached_property
+    def prompt_text(self) -> str:
+        return f"name: {self.name} ({self.type}) - evidence: {self.evidence}"
+
 class ESCOSkill(BaseSkill):
+    PROMPT_DESCRIPTION_LENGTH: ClassVar[int] = 240
+
     uri: str
     title: str
     reference_language: str
@@ -34,6 +42,14 @@ class ESCOSkill(BaseSkill):
         if language is None:
             language = self.reference_language
         return self.description.get(language, "No description available")
+
+    @cached_property
+    def prompt_text(self) -> str:
+        # Only the title and a short description in one language go to the LLM, links and translations are left out
+        description = self.get_description()
+        if len(description) > self.PROMPT_DESCRIPTION_LENGTH:
+            description = description[:self.PROMPT_DESCRIPTION_LENGTH].rstrip() + "..."
+        return f"title: {self.title} - description: {description}"
  
 
 class SkillList(BaseModel):
@@ -47,3 +63,11 @@ class CustomSkillList(SkillList):
 
     def get_skill_by_id(self, id: int) -> CustomSkill:
         return self.skills[id]
+
+
+class SkillMapping(BaseModel):
+    skill_id: int = Field(description="The ID of the extracted skill.")
+    candidate_id: int = Field(description="The ID of the best matching skill from that extracted skill's candidates.")
+
+class SkillMappingList(BaseModel):
+    mappings: List[SkillMapping]
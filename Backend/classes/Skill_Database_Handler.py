@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
-from typing import List
-import requests
+from threading import Lock
+from typing import List, Optional
+from cachetools import TTLCache
+import asyncio
+import httpx
+import orjson
 from Backend.classes.Skill_Classes import ESCOSkill
 
 
@@ -15,26 +19,92 @@ class ESCODatabase(BaseSkillDatabaseHandler):
     ):
         super().__init__(url.rstrip('/'))
         self.language = language
+        # Keep connections to the ESCO API alive, HTTP/2 multiplexes concurrent searches over one of them
+        self.client = httpx.Client(
+            base_url=self.url,
+            headers={"Accept": "application/json"},
+            timeout=10,
+            transport=httpx.HTTPTransport(http2=True, limits=httpx.Limits(max_keepalive_connections=20), retries=3)
+        )
+        # Created on first use so it binds to the running event loop
+        self._async_client: Optional[httpx.AsyncClient] = None
+        # Many users describe the same skills, ESCO results change rarely
+        self._search_cache: TTLCache = TTLCache(maxsize=4096, ttl=24 * 60 * 60)
+        self._search_cache_lock = Lock()
 
     def search_skills(self, text: str, limit: int = 20) -> List[ESCOSkill]:
-        url = f"{self.url}/search"
-        params = {
+        cache_key = (text.strip().lower(), limit)
+        with self._search_cache_lock:
+            cached = self._search_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
+        response = self.client.get("/search", params=self._search_params(text, limit))
+        response.raise_for_status()
+        skill_list = self._parse_search_results(response.content)
+        with self._search_cache_lock:
+            self._search_cache[cache_key] = tuple(skill_list)
+        return skill_list
+
+    async def asearch_skills(self, text: str, limit: int = 20) -> List[ESCOSkill]:
+        cache_key = (text.strip().lower(), limit)
+        with self._search_cache_lock:
+            cached = self._search_cache.get(cache_key)
+        if cached is not None:
+            return list(cached)
+
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                base_url=self.url,
+                headers={"Accept": "application/json"},
+                timeout=10,
+                transport=httpx.AsyncHTTPTransport(http2=True, limits=httpx.Limits(max_connections=32), retries=3)
+            )
+        response = await self._async_client.get("/search", params=self._search_params(text, limit))
+        response.raise_for_status()
+        skill_list = self._parse_search_results(response.content)
+        with self._search_cache_lock:
+            self._search_cache[cache_key] = tuple(skill_list)
+        return skill_list
+
+    async def search_many(self, texts: List[str], limit: int = 20) -> List[List[ESCOSkill]]:
+        """Search for several skills concurrently, results are in the order of texts."""
+        return await asyncio.gather(*(self.asearch_skills(text, limit) for text in texts))
+
+    def _search_params(self, text: str, limit: int) -> dict:
+        return {
             "text": text,
             "language": self.language,
             "type": "skill",
             "limit": limit,
             "full": True
         }
-        response = requests.get(url, params=params)
 
-        skill_list = []
-        for skill in response.json()["_embedded"]["results"]:
-            skill_list.append(ESCOSkill(
+    def _parse_search_results(self, content: bytes) -> List[ESCOSkill]:
+        # The ESCO API is trusted to return well-formed skills, so validation is skipped
+        return [
+            ESCOSkill.model_construct(
                 uri=skill["uri"],
                 title=skill["title"],
                 reference_language=skill["referenceLanguage"][0],
                 preferred_label=skill["preferredLabel"],
-                description={desc[0]: desc[1]["literal"] for desc in skill["description"].items()},
+                description={language: desc["literal"] for language, desc in skill["description"].items()},
                 links=skill["_links"]
-            ))
-        return skill_list
+            )
+            for skill in orjson.loads(content)["_embedded"]["results"]
+        ]
+
+    def close(self) -> None:
+        self.client.close()
+
+    async def aclose(self) -> None:
+        self.close()
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def __enter__(self) -> "ESCODatabase":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
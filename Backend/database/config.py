@@ -1,9 +1,11 @@
 """Database configuration management."""
 
 import os
+import sqlite3
 from typing import Optional
 from pathlib import Path
 from dotenv import load_dotenv
+from sqlalchemy.pool import StaticPool
 
 load_dotenv()
 
@@ -13,9 +15,14 @@ class DatabaseConfig:
     def __init__(self):
         self.database_url = self._get_database_url()
         self.echo_sql = self._get_bool_env("DB_ECHO", False)
-        self.pool_size = self._get_int_env("DB_POOL_SIZE", 5)
-        self.max_overflow = self._get_int_env("DB_MAX_OVERFLOW", 10)
+        self.pool_size = self._get_int_env("DB_POOL_SIZE", 20)
+        self.max_overflow = self._get_int_env("DB_MAX_OVERFLOW", 40)
         self.pool_timeout = self._get_int_env("DB_POOL_TIMEOUT", 30)
+        self.pool_recycle = self._get_int_env("DB_POOL_RECYCLE", 1800)
+        self.pool_pre_ping = self._get_bool_env("DB_POOL_PRE_PING", True)
+        self.query_cache_size = self._get_int_env("DB_QUERY_CACHE_SIZE", 1200)
+        self.sqlite_wal = self._get_bool_env("DB_SQLITE_WAL", True)
+        self.sqlite_synchronous = self._get_sqlite_synchronous()
         
     def _get_database_url(self) -> str:
         """Get database URL from environment or use default."""
@@ -30,6 +37,13 @@ class DatabaseConfig:
         db_path = db_dir / "app_database.db"
         return f"sqlite:///{db_path}"
     
+    def _get_sqlite_synchronous(self) -> str:
+        """Get the SQLite synchronous mode, NORMAL is safe with WAL and avoids an fsync per commit."""
+        value = os.getenv("DB_SQLITE_SYNCHRONOUS", "NORMAL").upper()
+        if value in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            return value
+        return "NORMAL"
+    
     def _get_bool_env(self, key: str, default: bool) -> bool:
         """Get boolean value from environment variable."""
         value = os.getenv(key, "").lower()
@@ -51,12 +65,43 @@ class DatabaseConfig:
         """Check if the database is SQLite."""
         return self.database_url.startswith("sqlite")
     
+    @property
+    def is_sqlite_memory(self) -> bool:
+        """Check if the database is an in-memory SQLite database."""
+        return self.is_sqlite and (":memory:" in self.database_url or self.database_url.rstrip("/") in ("sqlite:", "sqlite+pysqlite:"))
+    
     @property
     def connect_args(self) -> dict:
         """Get connection arguments based on database type."""
         if self.is_sqlite:
-            return {"check_same_thread": False}
+            # Wait for locks held by other connections instead of failing right away
+            return {"check_same_thread": False, "timeout": 30}
         return {}
+    
+    def get_engine_options(self) -> dict:
+        """Get the create_engine options for the configured database type."""
+        options = {
+            "echo": self.echo_sql,
+            "connect_args": self.connect_args,
+            # Compiled SQL is cached per statement structure, make room for all statements the API issues
+            "query_cache_size": self.query_cache_size,
+        }
+        
+        # Every connection to an in-memory SQLite database is a new, empty database, so share a single one.
+        # The same holds if the sqlite3 module cannot share connections between threads
+        if self.is_sqlite_memory or (self.is_sqlite and sqlite3.threadsafety < 3):
+            options["poolclass"] = StaticPool
+        else:
+            # Pooled connections for PostgreSQL/MySQL and file-based SQLite, which allows concurrent readers with WAL
+            options.update({
+                "pool_size": self.pool_size,
+                "max_overflow": self.max_overflow,
+                "pool_timeout": self.pool_timeout,
+                "pool_recycle": self.pool_recycle,  # Replace connections before the server drops them
+                "pool_pre_ping": self.pool_pre_ping,  # Detect stale connections, e.g. after a database restart
+                "pool_use_lifo": True,  # Reuse warm connections so idle ones can time out
+            })
+        return options
 
 
 # Global config instance
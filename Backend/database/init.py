@@ -1,12 +1,15 @@
 """Database initialization and session management."""
 
 import logging
+import orjson
+import threading
 from contextlib import contextmanager
 from typing import Generator, Optional
 
 from sqlmodel import Session, SQLModel, create_engine
+from sqlalchemy import event, inspect
 from sqlalchemy.engine import Engine
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.orm import sessionmaker
 
 from .config import db_config
 
@@ -19,56 +22,98 @@ class DatabaseManager:
     
     def __init__(self):
         self._engine: Optional[Engine] = None
+        self._session_factory: Optional[sessionmaker] = None
+        self._initialized: bool = False
+        # Guards lazy creation so concurrent first requests do not build two engines and pools
+        self._lock = threading.Lock()
     
     @property
     def engine(self) -> Engine:
         """Get or create the database engine."""
         if self._engine is None:
-            self._engine = self._create_engine()
+            with self._lock:
+                if self._engine is None:
+                    self._engine = self._create_engine()
         return self._engine
     
+    @property
+    def session_factory(self) -> sessionmaker:
+        """Get or create the session factory bound to the engine."""
+        if self._session_factory is None:
+            engine = self.engine
+            with self._lock:
+                if self._session_factory is None:
+                    # Objects keep their loaded values after a commit instead of reloading them on the next access
+                    self._session_factory = sessionmaker(bind=engine, class_=Session, expire_on_commit=False)
+        return self._session_factory
+    
     def _create_engine(self) -> Engine:
         """Create the database engine with proper configuration."""
-        logger.info(f"Creating database engine for: {db_config.database_url}")
+        logger.info("Creating database engine for: %s", db_config.database_url)
         
-        engine_kwargs = {
-            "echo": db_config.echo_sql,
-            "connect_args": db_config.connect_args,
-        }
+        engine_kwargs = db_config.get_engine_options()
+        engine_kwargs.update({
+            # Skill labels, descriptions and links are stored in JSON columns
+            "json_serializer": lambda obj: orjson.dumps(obj).decode(),
+            "json_deserializer": orjson.loads,
+        })
         
-        # SQLite-specific configuration
+        engine = create_engine(db_config.database_url, **engine_kwargs)
         if db_config.is_sqlite:
-            engine_kwargs.update({
-                "poolclass": StaticPool,
-            })
-        else:
-            # PostgreSQL/MySQL configuration
-            engine_kwargs.update({
-                "pool_size": db_config.pool_size,
-                "max_overflow": db_config.max_overflow,
-                "pool_timeout": db_config.pool_timeout,
-            })
-        
-        return create_engine(db_config.database_url, **engine_kwargs)
+            event.listen(engine, "connect", self._set_sqlite_pragmas)
+        return engine
+    
+    @staticmethod
+    def _set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+        """Tune every new SQLite connection for concurrent reads and cheap commits."""
+        cursor = dbapi_connection.cursor()
+        if db_config.sqlite_wal:
+            # Readers no longer block the writer and a commit is an append instead of a journal rewrite
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={db_config.sqlite_synchronous}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")
+        cursor.execute("PRAGMA cache_size=-64000")
+        # SQLite ignores foreign key constraints unless they are enabled per connection
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
     
     def initialize_database(self) -> None:
-        """Initialize database tables."""
+        """Initialize database tables (only once per process)."""
+        if self._initialized:
+            logger.debug("Database already initialized, skipping table creation")
+            return
         try:
-            logger.info("Creating database tables")
-            SQLModel.metadata.create_all(self.engine)
+            # One query for all table names instead of create_all checking every table on its own
+            existing_tables = set(inspect(self.engine).get_table_names())
+            if existing_tables.issuperset(SQLModel.metadata.tables):
+                logger.info("Database tables already exist, skipping table creation")
+            else:
+                logger.info("Creating database tables")
+                SQLModel.metadata.create_all(self.engine)
+            if "chat_message" in existing_tables:
+                self._create_message_order_index()
+            self._initialized = True
             logger.info("Database initialization completed successfully")
         except Exception as e:
-            logger.error(f"Database initialization failed: {e}")
+            logger.error("Database initialization failed: %s", e)
             raise
     
+    def _create_message_order_index(self) -> None:
+        """Add the (session_id, timestamp) message index to databases created before it existed."""
+        # create_all never adds indexes to existing tables
+        for index in SQLModel.metadata.tables["chat_message"].indexes:
+            if index.name == "ix_chat_message_session_id_timestamp":
+                index.create(self.engine, checkfirst=True)
+    
     @contextmanager
     def get_session(self) -> Generator[Session, None, None]:
         """Get a database session with automatic cleanup."""
-        session = Session(self.engine)
+        session = self.session_factory()
         try:
             yield session
         except Exception as e:
-            logger.error(f"Database session error: {e}")
+            logger.error("Database session error: %s", e)
             session.rollback()
             raise
         finally:
@@ -76,7 +121,21 @@ class DatabaseManager:
     
     def create_session(self) -> Session:
         """Create a new database session (caller must close it)."""
-        return Session(self.engine)
+        return self.session_factory()
+    
+    def close(self, reset_only: bool = False) -> None:
+        """Dispose the engine's connection pool.
+        
+        With reset_only the pooled connections are only dropped, not closed, e.g. in a forked worker
+        whose parent still uses them. The engine then starts with a fresh pool.
+        """
+        with self._lock:
+            if self._engine is None:
+                return
+            self._engine.dispose(close=not reset_only)
+            if not reset_only:
+                self._engine = None
+                self._session_factory = None
 
 
 # Global database manager instance
@@ -87,6 +146,10 @@ def init_database():
     """Initialize the database."""
     db_manager.initialize_database()
 
+def close_database():
+    """Close all pooled database connections."""
+    db_manager.close()
+
 def get_db_session():
     """Get a database session context manager for use with 'with' statements."""
     return db_manager.get_session()
@@ -1,10 +1,11 @@
 from enum import Enum
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from typing import Optional, List, Literal, TYPE_CHECKING
 from datetime import datetime
-from openai.types.responses.response import Response as OpenAIResponse
 
 if TYPE_CHECKING:
+    from openai.types.responses.response import Response as OpenAIResponse
     from Backend.database.models.users import User
     from Backend.database.models.skills import ESCOSkillModel
 
@@ -25,7 +26,11 @@ class ChatSession(SQLModel, table=True):
     
     # Relationships
     user: "User" = Relationship(back_populates="chat_sessions")
-    chat_messages: List["ChatMessage"] = Relationship(back_populates="chat_session")
+    # Loaded in timestamp order (served by the session/timestamp index), so callers never need to sort
+    chat_messages: List["ChatMessage"] = Relationship(
+        back_populates="chat_session",
+        sa_relationship_kwargs={"order_by": "ChatMessage.timestamp"}
+    )
     esco_skills: List["ESCOSkillModel"] = Relationship(back_populates="chat_session")
 
     # Methods
@@ -42,18 +47,14 @@ class ChatSession(SQLModel, table=True):
         self.updated_at = datetime.now()
         session.add(self)  # Update the session's updated_at timestamp
         session.commit()
-        session.refresh(message)
         session.refresh(self)  # Refresh the session to update relationships
 
     def get_messages(self, role: MessageType | Literal["all"] = "all") -> List["ChatMessage"]:
         """Get messages filtered by role from loaded relationship"""
         if role == "all":
-            return sorted(self.chat_messages, key=lambda x: x.timestamp)
+            return list(self.chat_messages)
         else:
-            return sorted(
-                [message for message in self.chat_messages if message.role == role],
-                key=lambda x: x.timestamp
-            )
+            return [message for message in self.chat_messages if message.role == role]
 
     def get_last_message(self, role: MessageType | Literal["all"] = "all") -> Optional["ChatMessage"]:
         """Get the last message filtered by role from loaded relationship"""
@@ -66,21 +67,24 @@ class ChatSession(SQLModel, table=True):
     
     def to_openai_input(self) -> List[dict]:
         """Convert session messages to OpenAI API input format"""
-        messages = self.get_messages("all")
         return [
             {
                 "role": message.role.value,  # Convert enum to string
                 "content": message.message_content  # Simple string format
             }
-            for message in messages
+            for message in self.chat_messages
         ]
 
 
 class ChatMessage(SQLModel, table=True):
     __tablename__ = "chat_message"
+    # Serves "messages of a session ordered by time" straight from the index
+    __table_args__ = (
+        Index("ix_chat_message_session_id_timestamp", "session_id", "timestamp"),
+    )
     
     message_id: Optional[int] = Field(default=None, primary_key=True)
-    session_id: int = Field(foreign_key="chat_session.session_id", index=True)
+    session_id: int = Field(foreign_key="chat_session.session_id")  # Indexed by ix_chat_message_session_id_timestamp
     role: MessageType = Field(index=True)
     message_content: str
     usage: int = Field(default=0)
@@ -99,7 +103,7 @@ class ChatMessage(SQLModel, table=True):
         return f"ChatMessage(role={self.role}, message_content={self.message_content}, timestamp={self.timestamp})"
 
     @classmethod
-    def from_openai_message(cls,session: "ChatSession", message: OpenAIResponse):
+    def from_openai_message(cls,session: "ChatSession", message: "OpenAIResponse"):
         return cls(
             session_id=session.session_id,
             role=message.output[0].role,
@@ -1,13 +1,17 @@
 from enum import Enum
 from sqlmodel import SQLModel, Field, Relationship, Column
 from sqlalchemy import JSON
-from typing import Optional, Dict, Any, TYPE_CHECKING
+from sqlalchemy.dialects.postgresql import JSONB
+from typing import Optional, Dict, Any, Type, TYPE_CHECKING
 from datetime import datetime
 from Backend.classes.Skill_Classes import ESCOSkill, BaseSkill
 
 if TYPE_CHECKING:
     from Backend.database.models.messages import ChatMessage, ChatSession
 
+# Binary JSONB on PostgreSQL is parsed once on write instead of on every read, other databases keep JSON
+JSONType = JSON().with_variant(JSONB(), "postgresql")
+
 class SkillSystem(str, Enum):
     ESCO = "ESCO"
     # FREIWILLIGENPASS = "Freiwilligenpass"
@@ -28,9 +32,9 @@ class ESCOSkillModel(ChatSkillBase, table=True):
     uri: str = Field(max_length=255)
     title: str = Field(max_length=255)
     reference_language: str = Field(max_length=255)
-    preferred_label: Dict[str, str] = Field(sa_column=Column(JSON))
-    description: Dict[str, str] = Field(sa_column=Column(JSON))
-    links: Dict[str, Any] = Field(sa_column=Column(JSON))
+    preferred_label: Dict[str, str] = Field(sa_column=Column(JSONType))
+    description: Dict[str, str] = Field(sa_column=Column(JSONType))
+    links: Dict[str, Any] = Field(sa_column=Column(JSONType))
     
     skill_system: SkillSystem = Field(default=SkillSystem.ESCO, index=True)
     
@@ -62,4 +66,10 @@ class ESCOSkillModel(ChatSkillBase, table=True):
             preferred_label=skill.preferred_label,
             description=skill.description,
             links=skill.links
-        )
\ No newline at end of file
+        )
+
+
+# Table model storing the skills of each skill system, skill systems without a model have no skills yet
+SKILL_MODELS: Dict[SkillSystem, Type[ChatSkillBase]] = {
+    SkillSystem.ESCO: ESCOSkillModel,
+}
@@ -28,7 +28,6 @@ def create_user(username: str, email: str, session: Optional[Session] = None) ->
         user = User(username=username, email=email)
         db_session.add(user)
         db_session.commit()
-        db_session.refresh(user)
         return user
     
     if session is not None:
@@ -38,15 +37,15 @@ def create_user(username: str, email: str, session: Optional[Session] = None) ->
         with db_manager.get_session() as db_session:
             return _create_user(db_session)
     except Exception as e:
-        logger.error(f"Failed to create user {username}: {e}")
+        logger.error("Failed to create user %s: %s", username, e)
         raise
 
 
-def create_chat_session(user: User, session_name: str = None, session: Optional[Session] = None) -> ChatSession:
+def create_chat_session(user_id: int, session_name: str = None, session: Optional[Session] = None) -> ChatSession:
     """Create a new chat session for a user with an initial system prompt.
     
     Args:
-        user: The user to create the session for
+        user_id: The ID of the user to create the session for
         session_name: Optional name for the session
         session: Optional database session. If None, creates and manages session automatically.
     
@@ -55,12 +54,11 @@ def create_chat_session(user: User, session_name: str = None, session: Optional[
     """
     def _create_chat_session(db_session: Session) -> ChatSession:
         # Create the chat session
-        chat_session = ChatSession(user_id=user.user_id, session_name=session_name)
+        chat_session = ChatSession(user_id=user_id, session_name=session_name)
         db_session.add(chat_session)
-        db_session.commit()
-        db_session.refresh(chat_session)
+        db_session.flush()  # Assign the session ID without committing yet
         
-        # Add the initial system prompt message
+        # Add the initial system prompt message, committed together with the session
         system_prompt = get_prompt("interviewer")
         system_message = ChatMessage(
             session_id=chat_session.session_id,
@@ -69,7 +67,6 @@ def create_chat_session(user: User, session_name: str = None, session: Optional[
         )
         db_session.add(system_message)
         db_session.commit()
-        db_session.refresh(system_message)
         db_session.refresh(chat_session)  # Refresh to update chat_messages relationship
         
         return chat_session
@@ -81,7 +78,7 @@ def create_chat_session(user: User, session_name: str = None, session: Optional[
         with db_manager.get_session() as db_session:
             return _create_chat_session(db_session)
     except Exception as e:
-        logger.error(f"Failed to create chat session for user {user.user_id}: {e}")
+        logger.error("Failed to create chat session for user %s: %s", user_id, e)
         raise
 
 
@@ -115,7 +112,6 @@ def add_message(
         )
         db_session.add(message)
         db_session.commit()
-        db_session.refresh(message)
         db_session.refresh(session_obj)  # Refresh to update chat_messages relationship
         return message
     
@@ -126,7 +122,7 @@ def add_message(
         with db_manager.get_session() as db_session:
             return _add_message(db_session)
     except Exception as e:
-        logger.error(f"Failed to add message to session {chat_session.session_id}: {e}")
+        logger.error("Failed to add message to session %s: %s", chat_session.session_id, e)
         raise
 
 
@@ -178,7 +174,6 @@ def add_esco_skill(
         )
         db_session.add(skill)
         db_session.commit()
-        db_session.refresh(skill)
         db_session.refresh(session_obj)  # Refresh to update esco_skills relationship
         db_session.refresh(message_obj)  # Refresh to update derived_skills_esco relationship
         return skill
@@ -190,7 +185,7 @@ def add_esco_skill(
         with db_manager.get_session() as db_session:
             return _add_esco_skill(db_session)
     except Exception as e:
-        logger.error(f"Failed to add ESCO skill {title}: {e}")
+        logger.error("Failed to add ESCO skill %s: %s", title, e)
         raise
 
 
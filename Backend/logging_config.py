@@ -1,4 +1,5 @@
 import logging
+import os
 
 
 class ColoredFormatter(logging.Formatter):
@@ -15,27 +16,32 @@ class ColoredFormatter(logging.Formatter):
     RESET = '\033[0m'          # Reset color
     BOLD = '\033[1m'           # Bold text
     
+    def __init__(self, fmt=None, datefmt=None, style='%', **kwargs):
+        super().__init__(fmt=fmt, datefmt=datefmt, style=style, **kwargs)
+        # Build one colored formatter per level up front instead of splitting every formatted record
+        fmt = fmt or '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+        self._formatters = {}
+        for level, color in self.COLORS.items():
+            colored_fmt = (
+                fmt.replace('%(asctime)s', f'\033[90m%(asctime)s{self.RESET}', 1)  # Gray
+                .replace('%(name)s', f'\033[34m%(name)s{self.RESET}', 1)  # Blue
+                .replace('%(levelname)s', f'{color}{self.BOLD}%(levelname)s{self.RESET}', 1)
+            )
+            self._formatters[level] = logging.Formatter(colored_fmt, datefmt=datefmt, style=style, **kwargs)
+
     def format(self, record):
-        # Get the color for this log level
-        color = self.COLORS.get(record.levelname, self.RESET)
-        
-        # Format the message
-        log_message = super().format(record)
-        
-        # Apply colors to different parts
-        parts = log_message.split(' - ', 3)
-        if len(parts) >= 4:
-            timestamp, name, level, message = parts
-            # Color the level and make it bold
-            colored_level = f"{color}{self.BOLD}{level}{self.RESET}"
-            # Color the logger name
-            colored_name = f"\033[34m{name}{self.RESET}"  # Blue
-            # Color the timestamp
-            colored_timestamp = f"\033[90m{timestamp}{self.RESET}"  # Gray
-            
-            return f"{colored_timestamp} - {colored_name} - {colored_level} - {message}"
-        
-        return f"{color}{log_message}{self.RESET}"
+        formatter = self._formatters.get(record.levelname)
+        if formatter is None:
+            return f"{self.RESET}{super().format(record)}{self.RESET}"
+        return formatter.format(record)
+
+
+def get_log_level() -> str:
+    """Get the log level from the LOG_LEVEL environment variable, INFO if it is not a known level."""
+    level = os.getenv("LOG_LEVEL", "INFO").upper()
+    if level in logging.getLevelNamesMapping():
+        return level
+    return "INFO"
 
 
 def setup_logging():
@@ -49,7 +55,7 @@ def setup_logging():
 
     # Configure root logger
     root_logger = logging.getLogger()
-    root_logger.setLevel(logging.DEBUG)
+    root_logger.setLevel(get_log_level())
     root_logger.handlers.clear()  # Remove any existing handlers
     root_logger.addHandler(logger_handler)
 
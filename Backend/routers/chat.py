@@ -1,13 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from sqlmodel import Session
 import logging
 
-from Backend.database.init import get_db_session_dependency
-from Backend.database.models.users import User
-from Backend.database.models.messages import ChatSession, MessageType
-from Backend.database.utils import create_chat_session, add_message
+from Backend.database.init import db_manager, get_db_session_dependency
+from Backend.database.models.messages import ChatSession, ChatMessage, MessageType
+from Backend.database.utils import create_chat_session
 from Backend.schemas import ChatRequest, ChatResponse
-from Backend.auth import get_current_user
+from Backend.auth import get_current_user_id
 from Backend.classes.Skill_Database_Handler import ESCODatabase
 from Backend.classes.LLM import BaseLLM
 from Backend.utils import get_prompt
@@ -16,6 +17,9 @@ router = APIRouter(tags=["chat"])
 logger = logging.getLogger(__name__)
 
 
+# Appended to a streamed reply when processing fails after the response has started
+STREAM_ERROR_MARKER = "\n\n[ERROR] Failed to process chat message"
+
 # These will be set by the main app during startup
 _llm_instance = None
 _esco_database_handler = None
@@ -42,133 +46,213 @@ def get_esco_database_handler() -> ESCODatabase:
     return _esco_database_handler
 
 
-@router.post("/users/{user_id}/chat", response_model=ChatResponse)
-async def chat_with_user(
-    user_id: int,
-    chat_request: ChatRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db_session_dependency),
-    llm: BaseLLM = Depends(get_llm)
-):
-    """Process a chat message for a user."""
-    logger.debug(f"Starting chat request for user_id={user_id}, current_user={current_user.user_id}, "
-                f"session_id={chat_request.session_id}, message_length={len(chat_request.message)}")
-    
+def get_user_chat_session(user_id: int, current_user_id: int, chat_request: ChatRequest, db: Session) -> ChatSession:
+    """Get the chat session of a chat request, or create a new one if it has no session ID."""
     # Check if user is chatting as themselves
-    if user_id != current_user.user_id:
-        logger.debug(f"Authorization failed: user_id={user_id} != current_user.user_id={current_user.user_id}")
+    if user_id != current_user_id:
+        logger.debug("Authorization failed: user_id=%s != current_user_id=%s", user_id, current_user_id)
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Cannot chat as another user"
         )
-    logger.debug(f"Authorization passed: user is chatting as themselves")
+    logger.debug("Authorization passed: user is chatting as themselves")
     
     # Get or create chat session
     if chat_request.session_id:
-        logger.debug(f"Looking up existing session with ID: {chat_request.session_id}")
+        logger.debug("Looking up existing session with ID: %s", chat_request.session_id)
         # Use existing session
         session = db.get(ChatSession, chat_request.session_id)
         if not session:
-            logger.debug(f"Session {chat_request.session_id} not found in database")
+            logger.debug("Session %s not found in database", chat_request.session_id)
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Chat session not found"
             )
         if session.user_id != user_id:
-            logger.debug(f"Session ownership failed: session.user_id={session.user_id} != user_id={user_id}")
+            logger.debug("Session ownership failed: session.user_id=%s != user_id=%s", session.user_id, user_id)
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Session does not belong to this user"
             )
-        logger.debug(f"Using existing session: {session.session_id}, title='{session.session_name}', "
-                    f"message_count={len(session.chat_messages)}")
+        logger.debug("Using existing session: %s, title='%s'", session.session_id, session.session_name)
     else:
-        logger.debug(f"Creating new chat session for user {user_id}")
+        logger.debug("Creating new chat session for user %s", user_id)
         # Create new session
-        session = create_chat_session(current_user, "New Chat Session")
-        logger.debug(f"Created new session: {session.session_id}")
+        session = create_chat_session(current_user_id, "New Chat Session", db)
+        logger.debug("Created new session: %s", session.session_id)
+    return session
+
+
+def add_user_message(session: ChatSession, message: str) -> ChatMessage:
+    """Add a user message to a chat session, it stays pending and is committed together with the assistant message."""
+    logger.debug("Adding user message: '%.100s'", message)
+    user_message = ChatMessage(
+        session_id=session.session_id,
+        message_content=message,
+        role=MessageType.USER
+    )
+    session.chat_messages.append(user_message)
+    return user_message
+
+
+async def map_message_skills(llm: BaseLLM, session: ChatSession, assistant_message: ChatMessage, db: Session) -> int:
+    """Extract the skills of an assistant message, map them to ESCO skills and save them. Returns the number of mapped skills."""
+    # Extract skills from assistant message
+    logger.debug("Extracting skills from assistant message %s", assistant_message.message_id)
+    skills = await llm.extract_skills(
+        instruction=get_prompt("information_extractor"),
+        message=assistant_message
+    )
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Extracted %s skills: %s", len(skills), [skill.model_dump() for skill in skills])
+
+    # Map skills to available skills
+    logger.debug("Starting skill mapping process for %s skills", len(skills))
+    esco_database_handler = get_esco_database_handler()
+
+    # Search for available skills of all extracted skills concurrently
+    search_results = await esco_database_handler.search_many([skill.name for skill in skills], limit=20)
+    skills_to_map, available_skills = [], []
+    for skill, candidates in zip(skills, search_results):
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Found %s potential matches for '%s': %s",
+                         len(candidates), skill.name, [candidate.title for candidate in candidates])
+        if len(candidates) == 0:
+            logger.debug("No available skills found for '%s'", skill.name)
+            continue
+        skills_to_map.append(skill)
+        available_skills.append(candidates)
+
+    # Map all skills in a single LLM round trip
+    mapped_skills = []
+    if skills_to_map:
+        mapped_skills = await llm.map_skills(
+            instruction=get_prompt("information_batch_mapper"),
+            skills=skills_to_map,
+            available_skills=available_skills
+        )
+        for skill, mapped_skill in zip(skills_to_map, mapped_skills):
+            if mapped_skill is not None:
+                logger.debug("Mapped '%s' to '%s' (URI: %s)", skill.name, mapped_skill.title, mapped_skill.uri)
+    mapped_skills = [mapped_skill for mapped_skill in mapped_skills if mapped_skill is not None]
+
+    # Save all mapped skills in a single transaction
+    for mapped_skill in mapped_skills:
+        mapped_skill.session_id = session.session_id
+        mapped_skill.origin_message_id = assistant_message.message_id
+    db.add_all(mapped_skills)
+    await run_in_threadpool(db.commit)
+    return len(mapped_skills)
+
+
+@router.post("/users/{user_id}/chat", response_model=ChatResponse)
+async def chat_with_user(
+    user_id: int,
+    chat_request: ChatRequest,
+    current_user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db_session_dependency),
+    llm: BaseLLM = Depends(get_llm)
+):
+    """Process a chat message for a user."""
+    logger.debug("Starting chat request for user_id=%s, current_user_id=%s, session_id=%s, message_length=%s",
+                 user_id, current_user_id, chat_request.session_id, len(chat_request.message))
+    # Database work runs in the threadpool, a query waiting on a database lock must not block the event loop
+    session = await run_in_threadpool(get_user_chat_session, user_id, current_user_id, chat_request, db)
     
     try:
         # --- Chat logic ---
-        logger.debug(f"Starting chat processing for session {session.session_id}")
+        logger.debug("Starting chat processing for session %s", session.session_id)
+        user_message = await run_in_threadpool(add_user_message, session, chat_request.message)
         
-        # Add user message
-        logger.debug(f"Adding user message: '{chat_request.message[:100]}{'...' if len(chat_request.message) > 100 else ''}'")
-        user_message = add_message(
-            session, chat_request.message, MessageType.USER, db
-        )
-        logger.debug(f"User message added with ID: {user_message.message_id}")
-        
-        # Get LLM response (this will automatically save the assistant message to the database)
-        logger.debug(f"Requesting LLM response for session {session.session_id}")
-        assistant_message = llm.chat(
+        # Get LLM response (this will save the user and assistant message to the database in one commit)
+        logger.debug("Requesting LLM response for session %s", session.session_id)
+        assistant_message = await llm.chat(
             chat_session=session,
             db_session=db
         )
-        logger.debug(f"LLM response received: message_id={assistant_message.message_id}, "
-                    f"content_length={len(assistant_message.message_content)}, "
-                    f"preview='{assistant_message.message_content[:100]}{'...' if len(assistant_message.message_content) > 100 else ''}'")
-
-        # Extract skills from assistant message
-        logger.debug(f"Extracting skills from assistant message {assistant_message.message_id}")
-        skills = llm.extract_skills(
-            instruction=get_prompt("information_extractor"),
-            message=assistant_message
-        )
-        logger.debug(f"Extracted {len(skills)} skills: {[skill.model_dump() for skill in skills]}")
+        logger.debug("LLM response received: message_id=%s, content_length=%s, preview='%.100s'",
+                     assistant_message.message_id, len(assistant_message.message_content),
+                     assistant_message.message_content)
 
-        # Map skills to available skills
-        logger.debug(f"Starting skill mapping process for {len(skills)} skills")
-        esco_database_handler = get_esco_database_handler()
-        mapped_skills_count = 0
-        
-        for i, skill in enumerate(skills):
-            logger.debug(f"Processing skill {i+1}/{len(skills)}: '{skill.name}'")
-            
-            # Search for available skills
-            available_skills = esco_database_handler.search_skills(skill.name, limit=20)
-            logger.debug(f"Found {len(available_skills)} potential matches for '{skill.name}': {[skill.title for skill in available_skills]}")
-            
-            if len(available_skills) > 0:
-                mapped_skill = llm.map_skill(
-                    instruction=get_prompt("information_mapper"),
-                    skill=skill,
-                    available_skills=available_skills
-                )
-                logger.debug(f"Mapped '{skill.name}' to '{mapped_skill.title}' (URI: {mapped_skill.uri})")
-
-                # Save mapped skill to database
-                mapped_skill.session_id = session.session_id
-                mapped_skill.origin_message_id = assistant_message.message_id
-                db.add(mapped_skill)
-                db.commit()
-                db.refresh(mapped_skill)
-                logger.debug(f"Saved mapped skill to database with ID: {mapped_skill.id}")
-                # Add to session
-                session.esco_skills.append(mapped_skill)
-            else:
-                logger.debug(f"No available skills found for '{skill.name}'")
-                mapped_skill = None
-            
-            db.add(session)
-            db.commit()
-            db.refresh(session)
-            mapped_skills_count += 1
-            logger.debug(f"Added mapped skill to session. Total skills in session: {len(session.esco_skills)}")
-
-        logger.debug(f"Skill mapping completed. Mapped {mapped_skills_count} skills for session {session.session_id}")
+        mapped_skills_count = await map_message_skills(llm, session, assistant_message, db)
+        logger.debug("Skill mapping completed. Mapped %s skills for session %s", mapped_skills_count, session.session_id)
         
         response = ChatResponse(
             message=user_message,
             assistant_response=assistant_message,
             session_id=session.session_id
         )
-        logger.debug(f"Chat processing completed successfully for session {session.session_id}")
+        logger.debug("Chat processing completed successfully for session %s", session.session_id)
         return response
         
     except Exception as e:
-        logger.exception(f"Failed to process chat: {e}")
+        logger.exception("Failed to process chat: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to process chat message"
         )
+
+
+@router.post("/users/{user_id}/chat/stream")
+async def stream_chat_with_user(
+    user_id: int,
+    chat_request: ChatRequest,
+    current_user_id: int = Depends(get_current_user_id),
+    llm: BaseLLM = Depends(get_llm)
+):
+    """Process a chat message for a user and stream the assistant reply as plain text while it is generated.
+    
+    If processing fails after the reply has started, STREAM_ERROR_MARKER is appended to the stream.
+    """
+    logger.debug("Starting streaming chat request for user_id=%s, session_id=%s", user_id, chat_request.session_id)
+    # A dependency session is closed once the handler returns, but the stream keeps using this one, so it closes it
+    db = db_manager.create_session()
+    try:
+        session = await run_in_threadpool(get_user_chat_session, user_id, current_user_id, chat_request, db)
+        await run_in_threadpool(add_user_message, session, chat_request.message)
+
+        reply = llm.chat_stream(chat_session=session, db_session=db)
+        try:
+            # Wait for the first chunk so a failed OpenAI request still returns a proper error response
+            first_chunk = await anext(reply)
+        except Exception as e:
+            logger.exception("Failed to start streamed chat: %s", e)
+            await reply.aclose()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Failed to process chat message"
+            )
+    except BaseException:
+        db.close()
+        raise
+
+    async def reply_stream():
+        # The response has already started, so errors can only be reported inside the stream from here on
+        try:
+            assistant_message = None
+            chunk = first_chunk
+            while True:
+                if isinstance(chunk, ChatMessage):
+                    assistant_message = chunk
+                else:
+                    yield chunk
+                try:
+                    chunk = await anext(reply)
+                except StopAsyncIteration:
+                    break
+            # Skills are mapped after the reply is complete, the client already has the whole text
+            mapped_skills_count = await map_message_skills(llm, session, assistant_message, db)
+            logger.debug("Skill mapping completed. Mapped %s skills for session %s", mapped_skills_count, session.session_id)
+        except Exception as e:
+            logger.exception("Failed to process streamed chat: %s", e)
+            yield STREAM_ERROR_MARKER
+        finally:
+            await reply.aclose()
+            db.close()
+
+    # The session ID is sent as a header so a new session can be continued by the client
+    return StreamingResponse(
+        reply_stream(),
+        media_type="text/plain; charset=utf-8",
+        headers={"X-Session-Id": str(session.session_id)}
+    )
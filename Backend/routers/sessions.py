@@ -1,43 +1,81 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlmodel import Session, select
-from typing import List, Dict
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlmodel import Session, and_, or_, select
+from sqlalchemy.orm import selectinload
+from pydantic import TypeAdapter
+from typing import List, Dict, Optional
+from datetime import datetime
 import logging
 
 from Backend.database.init import get_db_session_dependency
-from Backend.database.models.users import User
 from Backend.database.models.messages import ChatSession, ChatMessage
-from Backend.database.models.skills import ESCOSkillModel, SkillSystem
+from Backend.database.models.skills import SKILL_MODELS, SkillSystem
 from Backend.database.utils import create_chat_session
 from Backend.schemas import (
     ChatSessionCreate, ChatSessionResponse, ChatSessionWithSkillsResponse,
-    MessageResponse, SkillResponse
+    MessageResponse, SkillResponse, UserResponse
 )
-from Backend.auth import get_current_user
+from Backend.auth import get_current_user, get_current_user_id
+from Backend.utils import to_json_response
 
 router = APIRouter(tags=["sessions"])
 logger = logging.getLogger(__name__)
 
+# Built once, the read endpoints below serialize straight to JSON bytes with them
+_messages_adapter = TypeAdapter(List[MessageResponse])
+_skills_adapter = TypeAdapter(List[SkillResponse])
+_skills_by_system_adapter = TypeAdapter(Dict[str, List[SkillResponse]])
+_sessions_with_skills_adapter = TypeAdapter(List[ChatSessionWithSkillsResponse])
+
+
+def check_session_access(session_id: int, user_id: int, db: Session) -> None:
+    """Check that a chat session exists and belongs to the user, only loading its owner ID."""
+    owner_id = db.exec(
+        select(ChatSession.user_id).where(ChatSession.session_id == session_id)
+    ).first()
+    if owner_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Chat session not found"
+        )
+    
+    # Check if session belongs to current user
+    if owner_id != user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied to this chat session"
+        )
+
+
+def get_skills(session_id: int, skill_system: SkillSystem, db: Session) -> list:
+    """Get the skills of a chat session for one skill system."""
+    skill_model = SKILL_MODELS.get(skill_system)
+    if skill_model is None:
+        return []
+    return db.exec(
+        select(skill_model).where(skill_model.session_id == session_id)
+    ).all()
+
 
 @router.post("/users/{user_id}/sessions", response_model=ChatSessionResponse)
-async def create_session(
+def create_session(
     user_id: int, 
     session_data: ChatSessionCreate, 
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
     db: Session = Depends(get_db_session_dependency)
 ):
     """Create a new chat session for a user."""
     # Check if user is creating session for themselves
-    if user_id != current_user.user_id:
+    if user_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Cannot create session for other users"
         )
     
     try:
-        session = create_chat_session(current_user, session_data.session_name)
+        session = create_chat_session(current_user_id, session_data.session_name)
         return session
     except Exception as e:
-        logger.exception(f"Failed to create session: {e}")
+        logger.exception("Failed to create session: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create chat session"
@@ -45,41 +83,27 @@ async def create_session(
 
 
 @router.get("/users/{user_id}/sessions", response_model=List[ChatSessionWithSkillsResponse])
-async def get_user_sessions(user_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db_session_dependency)):
+def get_user_sessions(user_id: int, current_user_id: int = Depends(get_current_user_id), db: Session = Depends(get_db_session_dependency)):
     """Get all chat sessions for a user with skills count."""
     # Check if user is accessing their own sessions
-    if user_id != current_user.user_id:
+    if user_id != current_user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied to other user's sessions"
         )
     
+    # Eager-load the skills of all sessions in one extra query instead of one per session
     sessions = db.exec(
-        select(ChatSession).where(ChatSession.user_id == user_id)
+        select(ChatSession)
+        .where(ChatSession.user_id == user_id)
+        .options(selectinload(ChatSession.esco_skills))
     ).all()
     
-    # For each session, get skills count (for now just ESCO)
-    sessions_with_skills = []
-    for session in sessions:
-        esco_skills = db.exec(
-            select(ESCOSkillModel).where(ESCOSkillModel.session_id == session.session_id)
-        ).all()
-        
-        session_data = ChatSessionWithSkillsResponse(
-            session_id=session.session_id,
-            user_id=session.user_id,
-            session_name=session.session_name,
-            created_at=session.created_at,
-            updated_at=session.updated_at,
-            esco_skills=esco_skills
-        )
-        sessions_with_skills.append(session_data)
-    
-    return sessions_with_skills
+    return to_json_response(_sessions_with_skills_adapter, sessions)
 
 
 @router.get("/sessions/{session_id}", response_model=ChatSessionResponse)
-async def get_session(session_id: int, db: Session = Depends(get_db_session_dependency)):
+def get_session(session_id: int, db: Session = Depends(get_db_session_dependency)):
     """Get a specific chat session."""
     session = db.get(ChatSession, session_id)
     if not session:
@@ -91,10 +115,10 @@ async def get_session(session_id: int, db: Session = Depends(get_db_session_depe
 
 
 @router.put("/sessions/{session_id}", response_model=ChatSessionResponse)
-async def update_session(
+def update_session(
     session_id: int, 
     session_data: ChatSessionCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: UserResponse = Depends(get_current_user),
     db: Session = Depends(get_db_session_dependency)
 ):
     """Update a chat session (currently only supports updating the name)."""
@@ -119,11 +143,10 @@ async def update_session(
         
         db.add(session)
         db.commit()
-        db.refresh(session)
         return session
         
     except Exception as e:
-        logger.exception(f"Failed to update session {session_id}: {e}")
+        logger.exception("Failed to update session %s: %s", session_id, e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to update chat session"
@@ -131,95 +154,61 @@ async def update_session(
 
 
 @router.get("/sessions/{session_id}/messages", response_model=List[MessageResponse])
-async def get_session_messages(session_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db_session_dependency)):
-    """Get all messages for a chat session."""
-    session = db.get(ChatSession, session_id)
-    if not session:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Chat session not found"
-        )
+def get_session_messages(
+    session_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    after: Optional[datetime] = None,
+    after_id: Optional[int] = None,
+    current_user_id: int = Depends(get_current_user_id),
+    db: Session = Depends(get_db_session_dependency)
+):
+    """Get the messages of a chat session, optionally only those after a cursor and at most `limit` of them.
     
-    # Check if session belongs to current user
-    if session.user_id != current_user.user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Access denied to this chat session"
-        )
+    The cursor is the timestamp and message ID of the last message of the previous page. Messages can
+    share a timestamp, so without after_id those sharing the cursor's timestamp are skipped.
+    """
+    check_session_access(session_id, current_user_id, db)
     
-    messages = db.exec(
-        select(ChatMessage)
-        .where(ChatMessage.session_id == session_id)
-        .order_by(ChatMessage.timestamp)
-    ).all()
-    return messages
+    # Keyset pagination on (timestamp, message_id), served by the (session_id, timestamp) index
+    query = select(ChatMessage).where(ChatMessage.session_id == session_id)
+    if after is not None:
+        if after_id is not None:
+            query = query.where(or_(
+                ChatMessage.timestamp > after,
+                and_(ChatMessage.timestamp == after, ChatMessage.message_id > after_id)
+            ))
+        else:
+            query = query.where(ChatMessage.timestamp > after)
+    query = query.order_by(ChatMessage.timestamp, ChatMessage.message_id)
+    if limit is not None:
+        query = query.limit(limit)
+    messages = db.exec(query).all()
+    return to_json_response(_messages_adapter, messages)
 
 
 @router.get("/sessions/{session_id}/skills/{skill_system}", response_model=List[SkillResponse])
-async def get_session_skills(
+def get_session_skills(
     session_id: int, 
     skill_system: SkillSystem,
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
     db: Session = Depends(get_db_session_dependency)
 ):
     """Get all skills for a chat session by skill system."""
-    session = db.get(ChatSession, session_id)
-    if not session:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Chat session not found"
-        )
+    check_session_access(session_id, current_user_id, db)
     
-    # Check if session belongs to current user
-    if session.user_id != current_user.user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Access denied to this chat session"
-        )
-    
-    # For now, only ESCO skills are implemented
-    if skill_system == SkillSystem.ESCO:
-        skills = db.exec(
-            select(ESCOSkillModel)
-            .where(ESCOSkillModel.session_id == session_id)
-        ).all()
-        return skills
-    else:
-        # Future skill systems can be added here
-        return []
+    return to_json_response(_skills_adapter, get_skills(session_id, skill_system, db))
 
 
 @router.get("/sessions/{session_id}/skills", response_model=Dict[str, List[SkillResponse]])
-async def get_all_session_skills(
+def get_all_session_skills(
     session_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user_id: int = Depends(get_current_user_id),
     db: Session = Depends(get_db_session_dependency)
 ):
     """Get all skills for a chat session grouped by skill system."""
-    session = db.get(ChatSession, session_id)
-    if not session:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Chat session not found"
-        )
-    
-    # Check if session belongs to current user
-    if session.user_id != current_user.user_id:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Access denied to this chat session"
-        )
-    
-    result = {}
-    
-    # Get ESCO skills
-    esco_skills = db.exec(
-        select(ESCOSkillModel)
-        .where(ESCOSkillModel.session_id == session_id)
-    ).all()
-    result["ESCO"] = esco_skills
-    
-    # Future skill systems can be added here
-    result["Freiwilligenpass"] = []
+    check_session_access(session_id, current_user_id, db)
     
-    return result
+    return to_json_response(_skills_by_system_adapter, {
+        skill_system.value: get_skills(session_id, skill_system, db)
+        for skill_system in SkillSystem
+    })
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Response, status
 from sqlmodel import Session, select
 from typing import List, Dict
 import logging
+import orjson
 
 from Backend.database.init import get_db_session_dependency
 from Backend.database.models.users import User
@@ -13,11 +14,15 @@ from Backend.auth import get_current_user
 router = APIRouter(prefix="/skills", tags=["skills"])
 logger = logging.getLogger(__name__)
 
+# Skill systems are fixed at import time, so the response body is serialized once as well
+SKILL_SYSTEM_NAMES = tuple(system.value for system in SkillSystem)
+_SKILL_SYSTEMS_JSON = orjson.dumps(SKILL_SYSTEM_NAMES)
+
 
 @router.get("/systems", response_model=List[str])
 async def get_skill_systems():
     """Get all available skill systems."""
-    return [system.value for system in SkillSystem]
+    return Response(content=_SKILL_SYSTEMS_JSON, media_type="application/json")
 
 
 
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlmodel import Session, select
-from typing import List
+from sqlalchemy.exc import IntegrityError
+from pydantic import TypeAdapter
+from typing import List, Optional
 import logging
 
 from Backend.database.init import get_db_session_dependency
@@ -8,40 +10,51 @@ from Backend.database.models.users import User
 from Backend.database.utils import create_user
 from Backend.schemas import UserCreate, UserResponse, UserLogin, Token
 from Backend.auth import create_access_token
+from Backend.utils import to_json_response
 
 router = APIRouter(prefix="/users", tags=["users"])
 logger = logging.getLogger(__name__)
 
+_users_adapter = TypeAdapter(List[UserResponse])
+
+
+def get_duplicate_user_field(error: IntegrityError) -> Optional[str]:
+    """Get the user field ("username" or "email") whose unique index a failed insert violated."""
+    # PostgreSQL reports the violated index by name, its message also contains the conflicting value
+    constraint_name = getattr(getattr(error.orig, "diag", None), "constraint_name", None)
+    error_message = constraint_name or str(error.orig)
+    # Index names (PostgreSQL/MySQL) first, then SQLite's "UNIQUE constraint failed: user.<column>"
+    for field in ("username", "email"):
+        if f"ix_user_{field}" in error_message:
+            return field
+    for field in ("username", "email"):
+        if f"user.{field}" in error_message:
+            return field
+    return None
+
 
 @router.post("/register", response_model=UserResponse)
-async def register_user(user_data: UserCreate, db: Session = Depends(get_db_session_dependency)):
+def register_user(user_data: UserCreate, db: Session = Depends(get_db_session_dependency)):
     """Register a new user."""
-    # Check if user already exists
-    existing_user = db.exec(
-        select(User).where(
-            (User.username == user_data.username) | 
-            (User.email == user_data.email)
-        )
-    ).first()
-    
-    if existing_user:
-        if existing_user.username == user_data.username:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Username already exists"
-            )
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email already exists"
-            )
-    
-    # Create new user
+    # The unique indexes on username and email detect duplicates, no lookup beforehand
     try:
-        user = create_user(user_data.username, user_data.email)
+        user = create_user(user_data.username, user_data.email, db)
         return user
+    except IntegrityError as e:
+        db.rollback()
+        duplicate_field = get_duplicate_user_field(e)
+        if duplicate_field == "username":
+            detail = "Username already exists"
+        elif duplicate_field == "email":
+            detail = "Email already exists"
+        else:
+            detail = "Username or email already exists"
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=detail
+        )
     except Exception as e:
-        logger.exception(f"Failed to create user: {e}")
+        logger.exception("Failed to create user: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create user"
@@ -49,9 +62,9 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db_sess
 
 
 @router.post("/login", response_model=Token)
-async def login_user(login_data: UserLogin, db: Session = Depends(get_db_session_dependency)):
+def login_user(login_data: UserLogin, db: Session = Depends(get_db_session_dependency)):
     """Login user and return JWT token."""
-    user = db.exec(select(User).where(User.username == login_data.username)).first()
+    user = db.exec(select(User).where(User.username == login_data.username).limit(1)).first()
     
     if not user:
         raise HTTPException(
@@ -70,7 +83,7 @@ async def login_user(login_data: UserLogin, db: Session = Depends(get_db_session
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int, db: Session = Depends(get_db_session_dependency)):
+def get_user(user_id: int, db: Session = Depends(get_db_session_dependency)):
     """Get user by ID."""
     user = db.get(User, user_id)
     if not user:
@@ -82,7 +95,16 @@ async def get_user(user_id: int, db: Session = Depends(get_db_session_dependency
 
 
 @router.get("", response_model=List[UserResponse])
-async def list_users(db: Session = Depends(get_db_session_dependency)):
-    """List all users (for testing/admin purposes)."""
-    users = db.exec(select(User)).all()
-    return users
+def list_users(
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db_session_dependency)
+):
+    """List users page by page (for testing/admin purposes)."""
+    users = db.exec(
+        select(User)
+        .order_by(User.user_id)
+        .limit(limit)
+        .offset(offset)
+    ).all()
+    return to_json_response(_users_adapter, users)
@@ -1,22 +1,37 @@
-from fastapi import APIRouter
-from fastapi.responses import HTMLResponse
+from fastapi import APIRouter, Request, Response
+from fastapi.responses import FileResponse, HTMLResponse
 from pathlib import Path
+import orjson
 
 router = APIRouter(tags=["utils"])
 
+FRONTEND_PATH = Path("Frontend/index.html")
+_HEALTH_JSON = orjson.dumps({"status": "healthy", "message": "API is running"})
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """Check an If-None-Match header against an ETag using weak comparison, as RFC 9110 requires for it."""
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
 
 @router.get("/", response_class=HTMLResponse)
-async def get_frontend():
+async def get_frontend(request: Request):
     """Serve the frontend HTML file."""
-    frontend_path = Path("Frontend/index.html")
-    if frontend_path.exists():
-        with open(frontend_path, "r", encoding="utf-8") as f:
-            return HTMLResponse(content=f.read())
-    else:
+    # Stat on every request so Content-Length and ETag match the file even if it is edited while running
+    try:
+        stat_result = FRONTEND_PATH.stat()
+    except FileNotFoundError:
         return HTMLResponse(content="<h1>Frontend not found</h1>")
+    response = FileResponse(FRONTEND_PATH, media_type="text/html", stat_result=stat_result)
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None and etag_matches(if_none_match, response.headers["etag"]):
+        return Response(status_code=304, headers={"etag": response.headers["etag"]})
+    return response
 
 
 @router.get("/health")
 async def health_check():
     """Simple health check endpoint."""
-    return {"status": "healthy", "message": "API is running"}
+    return Response(content=_HEALTH_JSON, media_type="application/json")
@@ -1,14 +1,26 @@
 from dotenv import load_dotenv
+from functools import lru_cache
+from fastapi import Response
+from pydantic import TypeAdapter
 import os
 import yaml
 from pathlib import Path
-from typing import Literal
+from typing import Any, Literal
 
 load_dotenv()
 
-def get_prompt(prompt_name: Literal["interviewer", "information_extractor", "information_mapper"]) -> str:
+@lru_cache(maxsize=None)
+def _load_prompts(prompt_file: str) -> dict:
+    # The prompt file is only read and parsed once per path
+    with open(Path(prompt_file), "r") as f:
+        return yaml.safe_load(f)["prompts"]
+
+def get_prompt(prompt_name: Literal["interviewer", "information_extractor", "information_mapper", "information_batch_mapper"]) -> str:
     # Default to prompts.yaml in Backend directory if PROMPT_FILE env var is not set
     prompt_file = os.getenv("PROMPT_FILE", "Backend/prompts.yaml")
-    with open(Path(prompt_file), "r") as f:
-        file = yaml.safe_load(f)
-        return file["prompts"][prompt_name]
\ No newline at end of file
+    return _load_prompts(prompt_file)[prompt_name]
+
+def to_json_response(adapter: TypeAdapter, data: Any) -> Response:
+    """Validate ORM objects against a response schema and serialize them to JSON in a single pass."""
+    content = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+    return Response(content=content, media_type="application/json")
@@ -1,12 +1,15 @@
-from Backend.api import app
+import os
 import uvicorn
 
 
 def main():
+    # uvicorn[standard] picks uvloop and httptools automatically when they are installed
+    workers = int(os.getenv("WORKERS", "1"))
     uvicorn.run(
-        app, 
+        "Backend.api:app",  # Import string so uvicorn can start multiple worker processes
         host="0.0.0.0", 
         port=8000,
+        workers=workers,
         log_config=None,  # Disable uvicorn's logging config
         access_log=True   # Keep access logs but use your format
     )
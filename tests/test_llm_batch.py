@@ -0,0 +1,104 @@
+import os
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import orjson
+
+from Backend.classes.LLM import OpenAILLM
+from Backend.database.models.messages import ChatMessage, MessageType
+
+
+def jsonl(*lines) -> SimpleNamespace:
+    return SimpleNamespace(content=b"\n".join(orjson.dumps(line) for line in lines) + b"\n")
+
+
+def output_line(custom_id: str, skill_name: str) -> dict:
+    skills = {"skills": [{"name": skill_name, "type": "technical", "confidence": 0.9, "evidence": "I code"}]}
+    return {
+        "custom_id": custom_id,
+        "error": None,
+        "response": {
+            "status_code": 200,
+            "body": {"output": [
+                {"type": "reasoning"},
+                {"type": "message", "content": [{"type": "output_text", "text": orjson.dumps(skills).decode()}]},
+            ]},
+        },
+    }
+
+
+class OpenAILLMBatchTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        with patch.dict(os.environ, {"OPENAI_API_KEY": "test"}):
+            self.llm = OpenAILLM(model_name="test-model")
+        self.client = SimpleNamespace(
+            files=SimpleNamespace(create=AsyncMock(), content=AsyncMock()),
+            batches=SimpleNamespace(create=AsyncMock(), retrieve=AsyncMock()),
+        )
+        self.llm.client = self.client
+
+    async def test_submit_extract_batch_writes_one_request_per_message(self):
+        self.client.files.create.return_value = SimpleNamespace(id="file-in")
+        self.client.batches.create.return_value = SimpleNamespace(id="batch-1")
+        messages = [
+            ChatMessage(message_id=1, session_id=1, role=MessageType.USER, message_content="I write Python"),
+            ChatMessage(message_id=2, session_id=1, role=MessageType.USER, message_content="I lead a team"),
+        ]
+
+        batch_id = await self.llm.submit_extract_batch("Extract skills", messages)
+
+        self.assertEqual(batch_id, "batch-1")
+        filename, content = self.client.files.create.call_args.kwargs["file"]
+        self.assertEqual(filename, "extract_skills.jsonl")
+        lines = [orjson.loads(line) for line in content.splitlines()]
+        self.assertEqual([line["custom_id"] for line in lines], ["1", "2"])
+        self.assertEqual(lines[0]["url"], "/v1/responses")
+        self.assertEqual(lines[0]["body"]["model"], "test-model")
+        self.assertEqual(lines[1]["body"]["input"][0], {"role": "system", "content": "Extract skills"})
+        self.assertEqual(lines[1]["body"]["input"][1], {"role": "user", "content": "I lead a team"})
+        self.client.batches.create.assert_awaited_once_with(
+            input_file_id="file-in", endpoint="/v1/responses", completion_window="24h"
+        )
+
+    async def test_poll_batch_parses_output_and_logs_failed_requests(self):
+        self.client.batches.retrieve.side_effect = [
+            SimpleNamespace(status="in_progress"),
+            SimpleNamespace(status="completed", output_file_id="file-out", error_file_id="file-err"),
+        ]
+        files = {
+            "file-out": jsonl(
+                output_line("1", "Python"),
+                {"custom_id": "2", "error": None, "response": {"status_code": 500, "body": {}}},
+            ),
+            "file-err": jsonl({"custom_id": "3", "error": None, "response": {"status_code": 400, "body": {}}}),
+        }
+        self.client.files.content.side_effect = lambda file_id: files[file_id]
+
+        with patch("Backend.classes.LLM.asyncio.sleep", AsyncMock()), self.assertLogs("Backend.classes.LLM", "WARNING") as logs:
+            results = await self.llm.poll_batch("batch-1")
+
+        self.assertEqual(list(results), ["1"])
+        self.assertEqual([skill.name for skill in results["1"]], ["Python"])
+        self.assertIn("2 of 3 messages", logs.output[0])
+        self.assertIn("'2'", logs.output[0])
+        self.assertIn("'3'", logs.output[0])
+
+    async def test_poll_batch_without_output_file(self):
+        self.client.batches.retrieve.return_value = SimpleNamespace(
+            status="completed", output_file_id=None, error_file_id="file-err"
+        )
+        self.client.files.content.return_value = jsonl({"custom_id": "1", "error": {"message": "bad request"}})
+
+        with self.assertLogs("Backend.classes.LLM", "WARNING"):
+            self.assertEqual(await self.llm.poll_batch("batch-1"), {})
+
+    async def test_poll_batch_raises_for_failed_batch(self):
+        self.client.batches.retrieve.return_value = SimpleNamespace(status="expired")
+
+        with self.assertRaises(RuntimeError):
+            await self.llm.poll_batch("batch-1")
+
+
+if __name__ == "__main__":
+    unittest.main()